@@ -0,0 +1,83 @@
+"""Benchmark de memoria: dict por lectura vs EcoFlowSample
+
+Uso: python bench_memory.py
+"""
+import gc
+import time
+import tracemalloc
+from datetime import datetime
+
+from main import EcoFlowSample
+
+SAMPLES = 100_000
+DEVICES = 10_000
+SWEEPS = 5
+
+RAW = {
+    "pd.soc": 87,
+    "pd.wattsInSum": 120,
+    "pd.wattsOutSum": 95,
+    "bms_bmsStatus.temp": 31,
+    "pd.remainTime": 5400,
+}
+
+# Un único equipo: el SN es el mismo objeto en todas las lecturas (como DEVICE_SN)
+DEVICE_SN = "R61Z000000000000"
+
+def serial(i):
+    """SN recién decodificado (como llega de la API en modo flota), no compartido"""
+    return "".join(["R6", "1Z", f"{i:012d}"])
+
+def legacy_sample(data, device_sn):
+    """Representación anterior de transform_ecoflow_data"""
+    return {
+        "soc_percent": data.get("pd.soc", 0),
+        "watts_in": data.get("pd.wattsInSum", 0),
+        "watts_out": data.get("pd.wattsOutSum", 0),
+        "battery_temp": data.get("bms_bmsStatus.temp", 0),
+        "remaining_time_min": round(data.get("pd.remainTime", 0) / 60, 1),
+        "timestamp": datetime.now().isoformat(),
+        "device_sn": device_sn
+    }
+
+def compact_sample(data, device_sn):
+    """Representación actual de transform_ecoflow_data"""
+    return EcoFlowSample(
+        soc_percent=data.get("pd.soc", 0),
+        watts_in=data.get("pd.wattsInSum", 0),
+        watts_out=data.get("pd.wattsOutSum", 0),
+        battery_temp=data.get("bms_bmsStatus.temp", 0),
+        remaining_time_min=round(data.get("pd.remainTime", 0) / 60, 1),
+        timestamp=time.time_ns() // 1000,
+        device_sn=device_sn
+    )
+
+def measure(build):
+    """Bytes retenidos por el resultado de build()"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return after - before
+
+def single_device(factory):
+    return [factory(RAW, DEVICE_SN) for _ in range(SAMPLES)]
+
+def fleet_history(factory):
+    return [
+        [factory(RAW, serial(i)) for i in range(DEVICES)]
+        for _ in range(SWEEPS)
+    ]
+
+def main():
+    print(f"{'':12} {'bytes/lectura':>14} {'KiB/barrido 10k':>16}")
+    for name, factory in (("dict", legacy_sample), ("slots", compact_sample)):
+        per_sample = measure(lambda: single_device(factory)) / SAMPLES
+        per_sweep = measure(lambda: fleet_history(factory)) / SWEEPS / 1024
+        print(f"{name:12} {per_sample:14.1f} {per_sweep:16.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ import ssl
 import random
 import paho.mqtt.client as mqtt
 import os
+import sys
 import tinytuya
 from datetime import datetime, time as dt_time
 import asyncio
@@ -37,6 +38,18 @@ TUYA_API_REGION = os.environ.get("TUYA_API_REGION", "us")
 TELEGRAM_BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN", "")
 TELEGRAM_CHAT_ID = os.environ.get("TELEGRAM_CHAT_ID", "")
 
+# 🔗 Webhooks salientes (Make.com u otros)
+# Variables por sink (PREFIJO = MAKE / WEBHOOK):
+#   <PREFIJO>_URL          URL del webhook (vacío = deshabilitado)
+#   <PREFIJO>_TRIGGER      condiciones separadas por coma, se envía si alguna se cumple
+#                          (ej. "soc_percent<30,soc_percent==88"; "always" = siempre)
+#   <PREFIJO>_BATCH_SIZE   lecturas por POST
+#   <PREFIJO>_FLUSH_SECONDS espera máxima para completar un lote
+#   <PREFIJO>_CONCURRENCY  POSTs simultáneos máximos
+#   <PREFIJO>_RETRIES      reintentos con backoff exponencial
+WEBHOOK_SINK_PREFIXES = {"make": "MAKE", "webhook": "WEBHOOK"}
+MAKE_DEFAULT_TRIGGER = "soc_percent<30,soc_percent==88"
+
 # ⚡ Configuración de Control
 BATTERY_THRESHOLD = 27
 POWER_THRESHOLD = 100
@@ -310,27 +323,78 @@ def get_ecoflow_status():
     log(f"🔗 Consultando API EcoFlow: {DEVICE_SN[:8]}...", "INFO")
     return make_api_request(url, params)
 
+# Plantilla JSON precompilada en el orden de los slots (mismo formato que json.dumps(dict))
+JSON_TEMPLATE = (
+    '{"soc_percent": %s, "watts_in": %s, "watts_out": %s, "battery_temp": %s, '
+    '"remaining_time_min": %s, "timestamp": %s, "device_sn": %s}'
+)
+encode_json_value = json.JSONEncoder().encode
+
+class EcoFlowSample:
+    """Lectura compacta de EcoFlow (campos fijos, sin __dict__)"""
+    __slots__ = (
+        "soc_percent",
+        "watts_in",
+        "watts_out",
+        "battery_temp",
+        "remaining_time_min",
+        "timestamp",
+        "device_sn",
+    )
+
+    def __init__(self, soc_percent, watts_in, watts_out, battery_temp,
+                 remaining_time_min, timestamp, device_sn):
+        self.soc_percent = soc_percent
+        self.watts_in = watts_in
+        self.watts_out = watts_out
+        self.battery_temp = battery_temp
+        self.remaining_time_min = remaining_time_min
+        # Epoch en microsegundos (int) en lugar de string ISO por lectura
+        self.timestamp = timestamp
+        # Un único string compartido por todas las lecturas del mismo equipo
+        self.device_sn = sys.intern(device_sn)
+
+    def iso_timestamp(self):
+        """Timestamp ISO local, igual que datetime.now().isoformat()"""
+        seconds, micros = divmod(self.timestamp, 1_000_000)
+        return datetime.fromtimestamp(seconds).replace(microsecond=micros).isoformat()
+
+    def to_json(self):
+        """Serializar directamente desde los slots (sin dict intermedio)"""
+        return JSON_TEMPLATE % (
+            encode_json_value(self.soc_percent),
+            encode_json_value(self.watts_in),
+            encode_json_value(self.watts_out),
+            encode_json_value(self.battery_temp),
+            encode_json_value(self.remaining_time_min),
+            encode_json_value(self.iso_timestamp()),
+            encode_json_value(self.device_sn),
+        )
+
+    def __repr__(self):
+        return f"EcoFlowSample({self.device_sn[:8]}..., {self.soc_percent}%, {self.watts_out}W)"
+
 def transform_ecoflow_data(raw_data):
-    """Transformar datos de EcoFlow"""
+    """Transformar datos de EcoFlow en un EcoFlowSample"""
     try:
         if not raw_data or 'data' not in raw_data:
             log("❌ No hay datos en la respuesta", "ERROR")
-            return {}
+            return None
         
         data = raw_data['data']
-        return {
-            "soc_percent": data.get("pd.soc", 0),
-            "watts_in": data.get("pd.wattsInSum", 0),
-            "watts_out": data.get("pd.wattsOutSum", 0),
-            "battery_temp": data.get("bms_bmsStatus.temp", 0),
-            "remaining_time_min": round(data.get("pd.remainTime", 0) / 60, 1),
-            "timestamp": datetime.now().isoformat(),
-            "device_sn": DEVICE_SN
-        }
+        return EcoFlowSample(
+            soc_percent=data.get("pd.soc", 0),
+            watts_in=data.get("pd.wattsInSum", 0),
+            watts_out=data.get("pd.wattsOutSum", 0),
+            battery_temp=data.get("bms_bmsStatus.temp", 0),
+            remaining_time_min=round(data.get("pd.remainTime", 0) / 60, 1),
+            timestamp=time.time_ns() // 1000,
+            device_sn=DEVICE_SN
+        )
     except Exception as e:
         log(f"❌ Error transformando datos: {e}", "ERROR")
         log(f"📊 Raw data: {raw_data}", "DATA")
-        return {}
+        return None
 
 # ============================================================================
 # MQTT CONFIG (CORREGIDO PARA VERSIÓN ANTIGUA)
@@ -363,22 +427,254 @@ def setup_mqtt():
         log(f"❌ Error configurando MQTT: {e}", "ERROR")
         return None
 
-def publish_mqtt(client, data):
-    """Publicar datos a MQTT"""
+def publish_mqtt(client, sample, payload):
+    """Publicar lectura (ya serializada) a MQTT"""
     if not client:
         return
     
     try:
-        payload = json.dumps(data)
         result = client.publish(MQTT_TOPIC, payload, qos=1)
         
         if result.rc == mqtt.MQTT_ERR_SUCCESS:
-            log(f"📡 MQTT publicado: {data.get('soc_percent', 0)}% batería", "DATA")
+            log(f"📡 MQTT publicado: {sample.soc_percent}% batería", "DATA")
         else:
             log(f"⚠️ Error MQTT publish: {result.rc}", "WARNING")
     except Exception as e:
         log(f"❌ Error publicando MQTT: {e}", "ERROR")
 
+# ============================================================================
+# WEBHOOKS SALIENTES (ASYNC)
+# ============================================================================
+
+TRIGGER_OPERATORS = {
+    "<=": lambda a, b: a <= b,
+    ">=": lambda a, b: a >= b,
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    ">": lambda a, b: a > b,
+}
+
+# Solo campos numéricos de la lectura pueden usarse en triggers
+TRIGGER_FIELDS = ("soc_percent", "watts_in", "watts_out", "battery_temp", "remaining_time_min")
+
+def parse_trigger(expression):
+    """Convertir "campo<valor,campo==valor" en una función sample -> bool"""
+    expression = (expression or "").strip()
+    if expression.lower() in ("", "always"):
+        return lambda sample: True
+    
+    conditions = []
+    for part in expression.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        for op, compare in TRIGGER_OPERATORS.items():
+            if op in part:
+                field, value = (x.strip() for x in part.split(op, 1))
+                if field not in TRIGGER_FIELDS:
+                    raise ValueError(f"Campo desconocido en trigger: {field}")
+                conditions.append((field, compare, float(value)))
+                break
+        else:
+            raise ValueError(f"Condición inválida en trigger: {part}")
+    
+    if not conditions:
+        raise ValueError(f"Trigger sin condiciones: {expression}")
+    
+    def trigger(sample):
+        return any(compare(getattr(sample, field), value) for field, compare, value in conditions)
+    return trigger
+
+class WebhookSink:
+    """Sink HTTP async: cola no bloqueante, lotes, concurrencia limitada y reintentos"""
+    
+    def __init__(self, name, url, trigger, batch_size=1, flush_seconds=60,
+                 max_concurrency=2, max_retries=3, backoff_seconds=2, queue_size=1000):
+        self.name = name
+        self.url = url
+        self.trigger = trigger
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = max(0, flush_seconds)
+        self.max_retries = max(0, max_retries)
+        self.max_concurrency = max(1, max_concurrency)
+        self.backoff_seconds = backoff_seconds
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.in_flight = set()
+        self.worker = None
+        
+        # Sesión con pool de conexiones reutilizables
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({'Content-Type': 'application/json'})
+    
+    def start(self):
+        """Lanzar el worker en el event loop actual"""
+        self.worker = asyncio.create_task(self._run())
+    
+    def submit(self, sample, payload):
+        """Encolar el JSON de la lectura si cumple el trigger (nunca bloquea MQTT/control)"""
+        try:
+            if not self.trigger(sample):
+                return
+        except Exception as e:
+            log(f"❌ Webhook {self.name}: error evaluando trigger, lectura omitida: {e}", "ERROR")
+            return
+        try:
+            self.queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            log(f"⚠️ Webhook {self.name}: cola llena, lectura descartada", "WARNING")
+    
+    async def _fill_batch(self, batch):
+        """Esperar la primera lectura y completar el lote hasta flush_seconds"""
+        batch.append(await self.queue.get())
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # asyncio.wait (no wait_for) para no perder una lectura ya sacada
+            # de la cola si el worker se cancela justo al cerrar
+            get_task = asyncio.ensure_future(self.queue.get())
+            try:
+                await asyncio.wait({get_task}, timeout=remaining)
+            except asyncio.CancelledError:
+                if get_task.done() and not get_task.cancelled():
+                    batch.append(get_task.result())
+                else:
+                    get_task.cancel()
+                raise
+            if not get_task.done():
+                get_task.cancel()
+                break
+            batch.append(get_task.result())
+    
+    async def _run(self):
+        """Worker: agrupar lecturas y despacharlas sin esperar a la respuesta"""
+        batch = []
+        holding_slot = False
+        try:
+            while True:
+                # Esperar un hueco libre antes de sacar lecturas de la cola:
+                # si el webhook va lento la cola se llena y submit() descarta
+                await self.semaphore.acquire()
+                holding_slot = True
+                await self._fill_batch(batch)
+                self._dispatch(batch)
+                holding_slot = False
+                batch = []
+        except asyncio.CancelledError:
+            if holding_slot:
+                self.semaphore.release()
+            # Enviar el lote que quedó a medio agrupar
+            if batch:
+                self._dispatch(batch, acquire=True)
+    
+    def _dispatch(self, batch, acquire=False):
+        task = asyncio.create_task(self._send(batch, acquire))
+        self.in_flight.add(task)
+        task.add_done_callback(self.in_flight.discard)
+    
+    async def _send(self, batch, acquire=False):
+        """POST de un lote con reintentos y backoff exponencial (libera el hueco al terminar)"""
+        # Forma fija por sink: objeto si batch_size == 1, lista en otro caso
+        if self.batch_size == 1:
+            body = batch[0]
+        else:
+            body = "[" + ", ".join(batch) + "]"
+        
+        if acquire:
+            await self.semaphore.acquire()
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    response = await asyncio.to_thread(
+                        self.session.post, self.url, data=body.encode(), timeout=15
+                    )
+                    if response.status_code < 500 and response.status_code != 429:
+                        log(f"🔗 Webhook {self.name}: {len(batch)} lectura(s) -> {response.status_code}", "DATA")
+                        return
+                    error = f"HTTP {response.status_code}"
+                except Exception as e:
+                    error = str(e)
+                
+                if attempt < self.max_retries:
+                    delay = self.backoff_seconds * (2 ** attempt) * random.uniform(0.5, 1.5)
+                    log(f"⚠️ Webhook {self.name}: {error}, reintento en {delay:.1f}s", "WARNING")
+                    await asyncio.sleep(delay)
+            
+            log(f"❌ Webhook {self.name}: {len(batch)} lectura(s) perdidas tras {self.max_retries} reintentos ({error})", "ERROR")
+        finally:
+            self.semaphore.release()
+    
+    async def close(self, timeout=30):
+        """Vaciar la cola, esperar envíos en curso y cerrar la sesión"""
+        if self.worker:
+            self.worker.cancel()
+            await asyncio.gather(self.worker, return_exceptions=True)
+        
+        # Lo que siga en cola (el worker pudo no llegar a arrancar)
+        remaining = []
+        while not self.queue.empty():
+            remaining.append(self.queue.get_nowait())
+        for i in range(0, len(remaining), self.batch_size):
+            self._dispatch(remaining[i:i + self.batch_size], acquire=True)
+        
+        if self.in_flight:
+            done, pending = await asyncio.wait(self.in_flight, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                log(f"⚠️ Webhook {self.name}: {len(pending)} envío(s) cancelados al cerrar", "WARNING")
+        self.session.close()
+
+def env_number(name, default, cast=int, minimum=None):
+    """Leer variable numérica; vacía o inválida usa el valor por defecto"""
+    raw = os.environ.get(name, "").strip()
+    if not raw:
+        return default
+    try:
+        value = cast(raw)
+    except ValueError:
+        log(f"⚠️ {name}={raw!r} inválido, usando {default}", "WARNING")
+        return default
+    if minimum is not None and value < minimum:
+        log(f"⚠️ {name}={raw!r} menor que {minimum}, usando {default}", "WARNING")
+        return default
+    return value
+
+def setup_webhook_sinks():
+    """Crear sinks configurados por variables de entorno"""
+    sinks = []
+    for name, prefix in WEBHOOK_SINK_PREFIXES.items():
+        url = os.environ.get(f"{prefix}_URL", "")
+        if not url:
+            continue
+        
+        default_trigger = MAKE_DEFAULT_TRIGGER if prefix == "MAKE" else "always"
+        try:
+            trigger = parse_trigger(os.environ.get(f"{prefix}_TRIGGER") or default_trigger)
+        except ValueError as e:
+            log(f"⚠️ Webhook {name}: trigger inválido ({e}), usando \"{default_trigger}\"", "WARNING")
+            trigger = parse_trigger(default_trigger)
+        
+        sink = WebhookSink(
+            name=name,
+            url=url,
+            trigger=trigger,
+            batch_size=env_number(f"{prefix}_BATCH_SIZE", 1, minimum=1),
+            flush_seconds=env_number(f"{prefix}_FLUSH_SECONDS", 60, float, minimum=0),
+            max_concurrency=env_number(f"{prefix}_CONCURRENCY", 2, minimum=1),
+            max_retries=env_number(f"{prefix}_RETRIES", 3, minimum=0),
+        )
+        sink.start()
+        sinks.append(sink)
+        log(f"✅ Webhook {name} configurado", "SUCCESS")
+    return sinks
+
 # ============================================================================
 # FUNCIÓN PRINCIPAL
 # ============================================================================
@@ -404,6 +700,7 @@ async def main_async():
     # Inicializar componentes
     controller = EcoFlowTuyaCloudController()
     mqtt_client = setup_mqtt()
+    webhook_sinks = setup_webhook_sinks()
     
     # Notificación de inicio
     if controller.telegram_enabled:
@@ -436,15 +733,20 @@ async def main_async():
             raw_data = get_ecoflow_status()
             
             if raw_data:
-                data = transform_ecoflow_data(raw_data)
+                sample = transform_ecoflow_data(raw_data)
                 
-                if data:
-                    # 2. Publicar a MQTT
-                    publish_mqtt(mqtt_client, data)
+                if sample:
+                    # 2. Publicar a MQTT (un único JSON para MQTT y webhooks)
+                    payload = sample.to_json()
+                    publish_mqtt(mqtt_client, sample, payload)
+                    
+                    # 2b. Encolar para webhooks (no bloquea)
+                    for sink in webhook_sinks:
+                        sink.submit(sample, payload)
                     
                     # 3. Aplicar lógica de control
-                    soc = data.get("soc_percent", 0)
-                    watts = data.get("watts_out", 0)
+                    soc = sample.soc_percent
+                    watts = sample.watts_out
                     
                     controller.check_conditions(soc, watts)
                     
@@ -481,6 +783,9 @@ async def main_async():
             mqtt_client.loop_stop()
             mqtt_client.disconnect()
         
+        for sink in webhook_sinks:
+            await sink.close()
+        
         if controller.telegram_enabled:
             duration = time.time() - start_time
             try:
@@ -0,0 +1,65 @@
+import json
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import EcoFlowSample, transform_ecoflow_data
+
+# 2026-10-19 02:41:25.851696 hora local, en microsegundos
+WHEN = datetime(2026, 10, 19, 2, 41, 25, 851696)
+WHEN_US = int(WHEN.timestamp()) * 1_000_000 + WHEN.microsecond
+
+
+def legacy_dict(soc, watts_in, watts_out, temp, remaining, when, device_sn):
+    """Formato anterior de transform_ecoflow_data"""
+    return {
+        "soc_percent": soc,
+        "watts_in": watts_in,
+        "watts_out": watts_out,
+        "battery_temp": temp,
+        "remaining_time_min": remaining,
+        "timestamp": when.isoformat(),
+        "device_sn": device_sn
+    }
+
+
+@pytest.mark.parametrize("values", [
+    (87, 120, 95, 31, 90.0),
+    (0, 0, 0.5, -3, 0.1),
+    (None, None, None, None, None),
+    (float("nan"), float("inf"), 1e20, 31, 1 / 3),
+])
+def test_to_json_matches_legacy_dict(values):
+    sample = EcoFlowSample(*values, WHEN_US, "R61Z0000ñ")
+    expected = legacy_dict(*values, WHEN, "R61Z0000ñ")
+    assert sample.to_json() == json.dumps(expected)
+    decoded = json.loads(sample.to_json())
+    assert list(decoded) == list(expected)
+    assert decoded["timestamp"] == expected["timestamp"]
+
+
+def test_iso_timestamp_keeps_microseconds():
+    sample = EcoFlowSample(50, 0, 0, 0, 0.0, WHEN_US, "SN")
+    assert sample.iso_timestamp() == "2026-10-19T02:41:25.851696"
+
+
+def test_iso_timestamp_without_microseconds():
+    whole = WHEN.replace(microsecond=0)
+    sample = EcoFlowSample(50, 0, 0, 0, 0.0, int(whole.timestamp()) * 1_000_000, "SN")
+    assert sample.iso_timestamp() == whole.isoformat()
+
+
+def test_transform_builds_sample():
+    sample = transform_ecoflow_data({"data": {"pd.soc": 87, "pd.remainTime": 5400}})
+    assert sample.soc_percent == 87
+    assert sample.remaining_time_min == 90.0
+    assert sample.watts_out == 0
+
+
+@pytest.mark.parametrize("raw", [None, {}, {"code": "0"}])
+def test_transform_without_data_returns_none(raw):
+    assert transform_ecoflow_data(raw) is None
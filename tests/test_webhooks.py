@@ -0,0 +1,216 @@
+import asyncio
+import json
+import os
+import sys
+import time
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from main import MAKE_DEFAULT_TRIGGER, EcoFlowSample, WebhookSink, parse_trigger
+
+
+def make_sample(soc=50):
+    return EcoFlowSample(soc, 0, 0, 0, 0.0, time.time_ns() // 1000, "R61Z0000")
+
+
+class FakeSession:
+    """Sesión HTTP de prueba: responde con los status indicados, en orden"""
+
+    def __init__(self, statuses=(200,), delay=0):
+        self.statuses = list(statuses)
+        self.delay = delay
+        self.bodies = []
+
+    def post(self, url, data=None, timeout=None):
+        time.sleep(self.delay)
+        self.bodies.append(json.loads(data))
+        status = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        return types.SimpleNamespace(status_code=status)
+
+    def close(self):
+        pass
+
+
+def make_sink(session, **kwargs):
+    sink = WebhookSink("test", "http://example.invalid", parse_trigger("always"),
+                       backoff_seconds=0, **kwargs)
+    sink.session = session
+    return sink
+
+
+def test_trigger_operator_precedence():
+    assert parse_trigger("soc_percent<=30")(make_sample(30))
+    assert not parse_trigger("soc_percent<30")(make_sample(30))
+    assert parse_trigger("soc_percent>=30")(make_sample(30))
+    assert parse_trigger("soc_percent!=30")(make_sample(31))
+
+
+def test_trigger_make_default():
+    trigger = parse_trigger(MAKE_DEFAULT_TRIGGER)
+    assert trigger(make_sample(29))
+    assert trigger(make_sample(88))
+    assert not trigger(make_sample(50))
+
+
+def test_trigger_always():
+    assert parse_trigger("always")(make_sample())
+    assert parse_trigger("")(make_sample())
+
+
+def test_trigger_ignores_empty_parts():
+    trigger = parse_trigger("soc_percent<30,")
+    assert trigger(make_sample(20))
+    assert not trigger(make_sample(40))
+
+
+@pytest.mark.parametrize("expression", ["device_sn<5", "foo<3", "soc_percent", ","])
+def test_trigger_rejects_invalid(expression):
+    with pytest.raises(ValueError):
+        parse_trigger(expression)
+
+
+def test_batches_split_on_close():
+    async def run():
+        session = FakeSession()
+        sink = make_sink(session, batch_size=3, flush_seconds=60)
+        sink.start()
+        for soc in range(7):
+            sink.submit(make_sample(soc), make_sample(soc).to_json())
+        await asyncio.sleep(0.1)
+        await sink.close()
+        return session.bodies
+
+    bodies = asyncio.run(run())
+    assert all(isinstance(body, list) for body in bodies)
+    assert sorted(len(body) for body in bodies) == [1, 3, 3]
+
+
+def test_partial_batch_after_flush_is_still_a_list():
+    async def run():
+        session = FakeSession()
+        sink = make_sink(session, batch_size=5, flush_seconds=0.05)
+        sink.start()
+        sink.submit(make_sample(), make_sample().to_json())
+        await asyncio.sleep(0.2)
+        for _ in range(5):
+            sink.submit(make_sample(), make_sample().to_json())
+        await sink.close()
+        return session.bodies
+
+    bodies = asyncio.run(run())
+    assert all(isinstance(body, list) for body in bodies)
+    assert [len(body) for body in bodies] == [1, 5]
+
+
+def test_single_reading_sink_sends_object():
+    async def run():
+        session = FakeSession()
+        sink = make_sink(session)
+        sink.start()
+        sink.submit(make_sample(), make_sample().to_json())
+        await sink.close()
+        return session.bodies
+
+    bodies = asyncio.run(run())
+    assert len(bodies) == 1 and isinstance(bodies[0], dict)
+
+
+def test_close_keeps_readings_of_partial_batch():
+    async def run():
+        session = FakeSession()
+        sink = make_sink(session, batch_size=10, flush_seconds=60)
+        sink.start()
+        for _ in range(4):
+            sink.submit(make_sample(), make_sample().to_json())
+            await asyncio.sleep(0)
+        await sink.close()
+        return session.bodies
+
+    assert sum(len(body) for body in asyncio.run(run())) == 4
+
+
+def test_zero_concurrency_is_clamped():
+    async def run():
+        session = FakeSession()
+        sink = make_sink(session, max_concurrency=0)
+        sink.start()
+        sink.submit(make_sample(), make_sample().to_json())
+        await sink.close(timeout=1)
+        return session.bodies
+
+    assert len(asyncio.run(run())) == 1
+
+
+def test_invalid_settings_fall_back_to_defaults(monkeypatch):
+    monkeypatch.setenv("MAKE_URL", "http://example.invalid")
+    monkeypatch.setenv("MAKE_TRIGGER", "soc_percent<30,")
+    monkeypatch.setenv("MAKE_BATCH_SIZE", "")
+    monkeypatch.setenv("MAKE_FLUSH_SECONDS", "abc")
+    monkeypatch.setenv("MAKE_CONCURRENCY", "0")
+    monkeypatch.setenv("MAKE_RETRIES", "-1")
+    monkeypatch.delenv("WEBHOOK_URL", raising=False)
+
+    async def run():
+        sinks = main.setup_webhook_sinks()
+        for sink in sinks:
+            await sink.close()
+        return sinks
+
+    [sink] = asyncio.run(run())
+    assert sink.batch_size == 1
+    assert sink.flush_seconds == 60
+    assert sink.max_concurrency == 2
+    assert sink.max_retries == 3
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_retries_on_throttle_and_server_errors(status):
+    async def run():
+        session = FakeSession(statuses=[status, status, 200])
+        sink = make_sink(session, max_retries=3)
+        sink.start()
+        sink.submit(make_sample(), make_sample().to_json())
+        await sink.close()
+        return session.bodies
+
+    assert len(asyncio.run(run())) == 3
+
+
+def test_no_retry_on_client_error():
+    async def run():
+        session = FakeSession(statuses=[404])
+        sink = make_sink(session, max_retries=3)
+        sink.start()
+        sink.submit(make_sample(), make_sample().to_json())
+        await sink.close()
+        return session.bodies
+
+    assert len(asyncio.run(run())) == 1
+
+
+def test_slow_webhook_is_bounded_by_queue():
+    async def run():
+        session = FakeSession(delay=0.05)
+        sink = make_sink(session, max_concurrency=1, queue_size=5)
+        sink.start()
+        for _ in range(50):
+            sink.submit(make_sample(), make_sample().to_json())
+            await asyncio.sleep(0)
+        state = (sink.queue.qsize(), len(sink.in_flight))
+        await sink.close()
+        return state, len(session.bodies)
+
+    (queued, in_flight), sent = asyncio.run(run())
+    assert queued <= 5
+    assert in_flight <= 1
+    assert sent < 50
+
+
+def test_trigger_error_skips_reading():
+    sink = WebhookSink("test", "http://example.invalid", lambda sample: sample.missing)
+    sink.submit(make_sample(), "{}")
+    assert sink.queue.qsize() == 0